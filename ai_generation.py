@@ -1,91 +1,493 @@
 # ai_generation.py
+import os
+import re
+import json
+import sqlite3
+import hashlib
 import logging
-from config import AI_MODEL, MAX_TOKENS, API_KEY
+import textwrap
+import functools
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Optional, Tuple
+from config import AI_MODEL, MAX_TOKENS, BATCH_MAX_TOKENS, API_KEY, CACHE_DIR, OLLAMA_BASE_URL, OLLAMA_MODEL
 from error_handling import handle_errors
-from openai import OpenAI
+from tenacity import before_sleep_log, retry, retry_if_exception, stop_after_attempt, wait_random_exponential
 
-# Initialize OpenAI client
-client = OpenAI(api_key=API_KEY)
+
+@functools.lru_cache(maxsize=1)
+def _get_client():
+    """Build the shared OpenAI client on first use.
+
+    openai (and the httpx/SSL setup it pulls in) is imported lazily so that
+    --help and argument errors don't pay for it.
+    """
+    if not API_KEY:
+        raise ValueError("No API key found. Please set the OPENAI_API_KEY environment variable.")
+    import httpx
+    from openai import AsyncOpenAI
+    # Shared HTTP connection pool so concurrent requests and retries reuse TCP/TLS sessions
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+        # Batched responses of up to BATCH_MAX_TOKENS can take minutes to generate
+        timeout=httpx.Timeout(600.0, connect=5.0)
+    )
+    # tenacity in _create_completion is the only retry policy
+    return AsyncOpenAI(api_key=API_KEY, http_client=http_client, max_retries=0)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_fallback_client():
+    """Build the client for the local OpenAI-compatible endpoint (e.g. Ollama) on first use."""
+    from openai import AsyncOpenAI
+    # Ollama ignores the key, but the client requires one
+    return AsyncOpenAI(base_url=OLLAMA_BASE_URL, api_key='ollama', max_retries=0)
+
+
+def _is_transient_error(exc: BaseException) -> bool:
+    """Return True for API errors worth retrying (rate limits, connection problems, timeouts)."""
+    from openai import APIConnectionError, RateLimitError
+    # APITimeoutError is a subclass of APIConnectionError
+    return isinstance(exc, (RateLimitError, APIConnectionError))
+
+
+# Prompts keep all static instructions in the system message and send only the
+# project context as the user message, so the shared prefix is eligible for
+# OpenAI's automatic prompt caching and our local cache keys stay stable.
+_CONTEXT_INTRO = """The user message is a JSON object describing the project: project_type, frameworks,
+services, entry_points, ports and environment_variables. If the project is Node.js with
+Express, apply Node.js with Express best practices."""
+
+_DOCKERFILE_REQUIREMENTS = """- Multi-stage build
+- Non-root user
+- Security best practices
+- Production optimizations
+- Health checks"""
+
+_COMPOSE_REQUIREMENTS = """- Network isolation
+- Resource constraints
+- Volume management
+- Health checks
+- Production-grade settings"""
+
+_README_REQUIREMENTS = "Include instructions on how to build and run the containers, best practices, and troubleshooting tips."
+
+SYSTEM_DOCKERFILE = f"""You are a senior DevOps engineer creating production Dockerfiles.
+{_CONTEXT_INTRO}
+
+Create a production Dockerfile for the project.
+
+Requirements:
+{_DOCKERFILE_REQUIREMENTS}
+
+Provide ONLY the Dockerfile content."""
+
+SYSTEM_COMPOSE = f"""You are a Docker expert creating production compose files.
+{_CONTEXT_INTRO}
+
+Create a docker-compose.yml for the project.
+
+Requirements:
+{_COMPOSE_REQUIREMENTS}
+
+Provide ONLY valid YAML."""
+
+SYSTEM_README = f"""You are a DevOps documentation expert.
+{_CONTEXT_INTRO}
+
+Generate a Docker README documentation for the project.
+{_README_REQUIREMENTS}
+
+Provide ONLY the markdown content."""
+
+SYSTEM_ALL = f"""You are a senior DevOps engineer creating production Docker configurations and documentation.
+{_CONTEXT_INTRO}
+
+Respond with a JSON object with exactly these string keys, each containing ONLY the file content:
+- "dockerfile": a production Dockerfile. Requirements:
+{textwrap.indent(_DOCKERFILE_REQUIREMENTS, '  ')}
+- "compose": a valid docker-compose.yml. Requirements:
+{textwrap.indent(_COMPOSE_REQUIREMENTS, '  ')}
+- "readme": Docker README documentation in markdown. {_README_REQUIREMENTS}"""
+
+
+@dataclass
+class GeneratedArtifacts:
+    """Docker configuration files produced by a single batched generation."""
+    dockerfile: str
+    compose: str
+    readme: str
+
+
+async def close_client() -> None:
+    """Close the shared HTTP connection pools, if any were opened; call before the event loop shuts down."""
+    for get_client in (_get_client, _get_fallback_client):
+        if get_client.cache_info().currsize:
+            await get_client().close()
+            get_client.cache_clear()
+
+
+# Response cache settings, adjusted from the CLI via configure_cache()
+_cache_settings = {'enabled': True, 'refresh': False}
+
+
+def configure_cache(enabled: bool = True, refresh: bool = False) -> None:
+    """Enable/disable the response cache or force cached entries to be regenerated."""
+    _cache_settings['enabled'] = enabled
+    _cache_settings['refresh'] = refresh
+
+
+def _cache_path(prompt: str, system_role: str, max_tokens: int, response_format: Optional[dict]) -> Path:
+    """Return the cache file for a request, keyed by its model, messages and output settings."""
+    payload = json.dumps({'m': AI_MODEL, 's': system_role, 'p': prompt, 't': max_tokens, 'f': response_format},
+                         sort_keys=True)
+    key = hashlib.sha256(payload.encode()).hexdigest()
+    return Path(CACHE_DIR) / f"{key}.txt"
+
+
+def _read_cache(path: Path) -> Optional[str]:
+    """Return the cached response, or None on a miss."""
+    try:
+        return path.read_text()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logging.warning(f"Error reading cache entry {path}: {str(e)}")
+        return None
+
+
+def _write_cache(path: Path, content: str) -> None:
+    """Atomically store a response so concurrent runs never see a partial entry."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(content)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logging.warning(f"Error writing cache entry {path}: {str(e)}")
+
+
+def _context_fingerprint(context: dict) -> Tuple:
+    """Reduce a project context to the fields that shape the generated artifacts."""
+    return (
+        context['project_type'],
+        tuple(sorted(set(context['frameworks']))),
+        tuple(sorted(context['ports'])),
+        tuple(sorted(context['env_vars'])),
+        tuple(sorted(context['entry_points'])),
+        tuple(sorted(context['services']))
+    )
+
+
+def _generator_key() -> str:
+    """Identify the model and prompt, so artifacts from an older combination are never reused."""
+    return hashlib.sha256(json.dumps([AI_MODEL, SYSTEM_ALL]).encode()).hexdigest()
+
+
+def _open_artifact_cache() -> sqlite3.Connection:
+    """Open (creating if needed) the artifact store used by the semantic cache."""
+    Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(Path(CACHE_DIR) / 'artifacts.sqlite3')
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS generated_artifacts ("
+        "generator TEXT, project_type TEXT, frameworks TEXT, env_vars TEXT, entry_points TEXT, "
+        "services TEXT, ports TEXT, dockerfile TEXT, compose TEXT, readme TEXT, "
+        "PRIMARY KEY (generator, project_type, frameworks, env_vars, entry_points, services, ports))"
+    )
+    return conn
+
+
+# Places a port number appears as a port rather than as any other number:
+# host:container mappings, host:port URLs and PORT=/PORT: assignments
+_PORT_REF_RE = re.compile(r'(?P<pre>:|\bPORT\s*[=:]\s*["\']?)(?P<port>\d+)(?!\d)|(?<![\d.])(?P<left>\d+)(?=:\d)')
+_EXPOSE_LINE_RE = re.compile(r'^([ \t]*EXPOSE\b)(.*)$', re.IGNORECASE | re.MULTILINE)
+_NUMBER_RE = re.compile(r'(?<!\d)\d+(?!\d)')
+
+
+def _replace_ports(text: str, port_map: dict) -> str:
+    """Rewrite port references (EXPOSE lines, port mappings, PORT settings) using port_map.
+
+    Each occurrence is substituted once, so swapped ports don't collide, and
+    other numbers that merely equal an old port are left alone.
+    """
+    def map_number(value: str) -> str:
+        return str(port_map.get(int(value), value))
+
+    def replace_ref(m: re.Match) -> str:
+        if m.group('left') is not None:
+            return map_number(m.group('left'))
+        return m.group('pre') + map_number(m.group('port'))
+
+    text = _EXPOSE_LINE_RE.sub(
+        lambda m: m.group(1) + _NUMBER_RE.sub(lambda n: map_number(n.group(0)), m.group(2)), text)
+    # EXPOSE lines contain no ':' mappings or PORT settings, so this pass can't touch them again
+    return _PORT_REF_RE.sub(replace_ref, text)
+
+
+def _lookup_artifacts(fingerprint: Tuple) -> Optional[GeneratedArtifacts]:
+    """Return stored artifacts for an identical context, or patched ones for a near match.
+
+    A near match differs only in its port numbers (same count of ports); those
+    are rewritten to the new ones instead of calling the model again. If an old
+    port is still mentioned anywhere after rewriting, the reference wasn't
+    recognised and the entry is treated as a miss rather than risk a broken config.
+    """
+    project_type, frameworks, ports, env_vars, entry_points, services = fingerprint
+    try:
+        with closing(_open_artifact_cache()) as conn:
+            rows = conn.execute(
+                "SELECT ports, dockerfile, compose, readme FROM generated_artifacts "
+                "WHERE generator = ? AND project_type = ? AND frameworks = ? AND env_vars = ? "
+                "AND entry_points = ? AND services = ?",
+                (_generator_key(), project_type, json.dumps(frameworks), json.dumps(env_vars),
+                 json.dumps(entry_points), json.dumps(services))
+            ).fetchall()
+    except (OSError, sqlite3.Error) as e:
+        logging.warning(f"Error reading artifact cache: {str(e)}")
+        return None
+    near_match = None
+    for stored_ports, dockerfile, compose, readme in rows:
+        stored_ports = tuple(json.loads(stored_ports))
+        if stored_ports == ports:
+            logging.info("Using cached artifacts for an identical project context")
+            return GeneratedArtifacts(dockerfile=dockerfile, compose=compose, readme=readme)
+        if near_match is None and ports and len(stored_ports) == len(ports):
+            near_match = (stored_ports, dockerfile, compose, readme)
+    if near_match is None:
+        return None
+    stored_ports, dockerfile, compose, readme = near_match
+    # Ports present in both contexts stay put; only the changed ones are paired up
+    removed = sorted(set(stored_ports) - set(ports))
+    port_map = dict(zip(removed, sorted(set(ports) - set(stored_ports))))
+    adapted = GeneratedArtifacts(
+        dockerfile=_replace_ports(dockerfile, port_map),
+        compose=_replace_ports(compose, port_map),
+        readme=_replace_ports(readme, port_map)
+    )
+    leftover = {int(n) for text in (adapted.dockerfile, adapted.compose, adapted.readme)
+                for n in _NUMBER_RE.findall(text)} & set(removed)
+    if leftover:
+        logging.info(f"Not reusing cached artifacts: port(s) {sorted(leftover)} could not be safely rewritten")
+        return None
+    logging.info(f"Adapting cached artifacts from a similar project context (ports {list(stored_ports)} -> {list(ports)})")
+    return adapted
+
+
+def _store_artifacts(fingerprint: Tuple, artifacts: GeneratedArtifacts) -> None:
+    """Record generated artifacts for reuse by later runs on similar projects."""
+    project_type, frameworks, ports, env_vars, entry_points, services = fingerprint
+    try:
+        with closing(_open_artifact_cache()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO generated_artifacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (_generator_key(), project_type, json.dumps(frameworks), json.dumps(env_vars),
+                 json.dumps(entry_points), json.dumps(services), json.dumps(ports),
+                 artifacts.dockerfile, artifacts.compose, artifacts.readme)
+            )
+    except (OSError, sqlite3.Error) as e:
+        logging.warning(f"Error writing artifact cache: {str(e)}")
+
+
+async def _request_completion(client, model: str, prompt: str, system_role: str, max_tokens: int,
+                              response_format: Optional[dict], stream: bool):
+    """Send a single chat completion request to the given client."""
+    extra = {'response_format': response_format} if response_format else {}
+    return await client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_role},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.2,
+        max_tokens=max_tokens,
+        stream=stream,
+        **extra
+    )
+
+
+@retry(
+    retry=retry_if_exception(_is_transient_error),
+    wait=wait_random_exponential(min=1, max=30),
+    stop=stop_after_attempt(6),
+    before_sleep=before_sleep_log(logging.getLogger(__name__), logging.WARNING),
+    reraise=True
+)
+async def _create_completion(prompt: str, system_role: str, max_tokens: int, response_format: Optional[dict],
+                             stream: bool = False):
+    """Request an OpenAI chat completion, retrying transient API failures with jittered backoff.
+
+    With stream=True only opening the stream is retried; the returned stream yields chunks.
+    """
+    return await _request_completion(_get_client(), AI_MODEL, prompt, system_role, max_tokens,
+                                     response_format, stream)
+
+
+async def _complete(prompt: str, system_role: str, max_tokens: int, response_format: Optional[dict],
+                    stream: bool = False) -> Tuple[object, bool]:
+    """Request a completion, falling back to the local endpoint if OpenAI stays unavailable.
+
+    Returns the response and whether it came from the fallback model; fallback
+    output is never cached, so a later run can still get the OpenAI result.
+    """
+    try:
+        return await _create_completion(prompt, system_role, max_tokens, response_format, stream), False
+    except Exception as e:
+        if not (OLLAMA_BASE_URL and _is_transient_error(e)):
+            raise
+        logging.warning(f"OpenAI unavailable ({str(e)}); falling back to {OLLAMA_MODEL} at {OLLAMA_BASE_URL}")
+    response = await _request_completion(_get_fallback_client(), OLLAMA_MODEL, prompt, system_role, max_tokens,
+                                         response_format, stream)
+    return response, True
+
+
+async def _generate(prompt: str, system_role: str, max_tokens: int,
+                    response_format: Optional[dict]) -> Tuple[str, bool, Optional[Path]]:
+    """Return generated content, whether it may be cached (i.e. it did not come from the fallback)
+    and, for a fresh response, the path the caller should cache it at once it has been accepted.
+    """
+    cache_path = None
+    if _cache_settings['enabled']:
+        cache_path = _cache_path(prompt, system_role, max_tokens, response_format)
+    if cache_path and not _cache_settings['refresh']:
+        cached = _read_cache(cache_path)
+        if cached is not None:
+            logging.info(f"Using cached AI response: {cache_path.name}")
+            return cached, True, None
+    try:
+        response, from_fallback = await _complete(prompt, system_role, max_tokens, response_format)
+        choice = response.choices[0]
+        content = choice.message.content
+        # Never cache output that was cut off by the token limit
+        if not (content and choice.finish_reason == 'stop' and not from_fallback):
+            cache_path = None
+        return content, not from_fallback, cache_path
+    except Exception as e:
+        logging.error(f"OpenAI API error: {str(e)}")
+        raise
 
 
 @handle_errors
-def generate_with_ai(prompt: str, system_role: str) -> str:
-    """Generate content using AI with error management."""
+async def generate_with_ai(prompt: str, system_role: str, max_tokens: int = MAX_TOKENS,
+                           response_format: Optional[dict] = None) -> str:
+    """Generate content using AI with error management and response caching."""
+    content, _, cache_path = await _generate(prompt, system_role, max_tokens, response_format)
+    if cache_path:
+        _write_cache(cache_path, content)
+    return content
+
+
+@handle_errors
+async def stream_with_ai(prompt: str, system_role: str, max_tokens: int = MAX_TOKENS) -> AsyncIterator[str]:
+    """Yield generated content as it arrives, sharing the response cache with generate_with_ai."""
+    cache_path = None
+    if _cache_settings['enabled']:
+        cache_path = _cache_path(prompt, system_role, max_tokens, None)
+    if cache_path and not _cache_settings['refresh']:
+        cached = _read_cache(cache_path)
+        if cached is not None:
+            logging.info(f"Using cached AI response: {cache_path.name}")
+            yield cached
+            return
+    parts = []
+    finish_reason = None
     try:
-        response = client.chat.completions.create(
-            model=AI_MODEL,
-            messages=[
-                {"role": "system", "content": system_role},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-            max_tokens=MAX_TOKENS
-        )
-        return response.choices[0].message.content
+        response, from_fallback = await _complete(prompt, system_role, max_tokens, None, stream=True)
+        async for chunk in response:
+            if not chunk.choices:
+                continue
+            choice = chunk.choices[0]
+            finish_reason = choice.finish_reason or finish_reason
+            if choice.delta.content:
+                parts.append(choice.delta.content)
+                yield choice.delta.content
     except Exception as e:
         logging.error(f"OpenAI API error: {str(e)}")
         raise
+    # Never cache output that was cut off by the token limit
+    if cache_path and parts and finish_reason == 'stop' and not from_fallback:
+        _write_cache(cache_path, ''.join(parts))
+
+
+def _prompt_context(context: dict) -> str:
+    """Serialize the project details sent to the model, with stable key order."""
+    return json.dumps({
+        'project_type': context['project_type'],
+        'frameworks': context['frameworks'],
+        'services': list(context['services'].keys()),
+        'entry_points': context['entry_points'],
+        'ports': context['ports'],
+        'environment_variables': list(context['env_vars'].keys())
+    }, sort_keys=True)
 
 
 @handle_errors
-def generate_dockerfile(context: dict) -> str:
+async def generate_dockerfile(context: dict) -> str:
     """Generate a production-ready Dockerfile tailored to the project."""
-    framework_details = ""
-    if context['project_type'] == 'node' and 'express' in context['frameworks']:
-        framework_details = "Apply Node.js with Express best practices."
-    prompt = f"""
-    Create a production Dockerfile for a {context['project_type']} project.
-    Frameworks: {context['frameworks']} {framework_details}
-    Entry points: {context['entry_points']}
-    Ports: {context['ports']}
-    Environment variables: {list(context['env_vars'].keys())}
-
-    Requirements:
-    - Multi-stage build
-    - Non-root user
-    - Security best practices
-    - Production optimizations
-    - Health checks
-
-    Provide ONLY the Dockerfile content.
-    """
-    return generate_with_ai(prompt, "You are a senior DevOps engineer creating production Dockerfiles.")
+    return await generate_with_ai(_prompt_context(context), SYSTEM_DOCKERFILE)
 
 
 @handle_errors
-def generate_docker_compose(context: dict) -> str:
+async def generate_docker_compose(context: dict) -> str:
     """Generate a docker-compose.yml for multi-service and single-service projects."""
-    prompt = f"""
-    Create a docker-compose.yml for a {context['project_type']} project.
-    Detected services: {list(context['services'].keys())}
-    Ports: {context['ports']}
-    Environment variables: {list(context['env_vars'].keys())}
-
-    Requirements:
-    - Network isolation
-    - Resource constraints
-    - Volume management
-    - Health checks
-    - Production-grade settings
-
-    Provide ONLY valid YAML.
-    """
-    return generate_with_ai(prompt, "You are a Docker expert creating production compose files.")
+    return await generate_with_ai(_prompt_context(context), SYSTEM_COMPOSE)
 
 
 @handle_errors
-def generate_docker_readme(context: dict) -> str:
+async def generate_docker_readme(context: dict) -> str:
     """Generate documentation for the Docker setup."""
-    prompt = f"""
-    Generate a Docker README documentation for a {context['project_type']} project with the following details:
-    - Detected frameworks: {context['frameworks']}
-    - Services: {list(context['services'].keys())}
-    - Entry points: {context['entry_points']}
-    - Ports: {context['ports']}
-    - Environment variables: {list(context['env_vars'].keys())}
+    return await generate_with_ai(_prompt_context(context), SYSTEM_README)
+
+
+def stream_dockerfile(context: dict) -> AsyncIterator[str]:
+    """Stream a production-ready Dockerfile tailored to the project."""
+    return stream_with_ai(_prompt_context(context), SYSTEM_DOCKERFILE)
+
+
+def stream_docker_compose(context: dict) -> AsyncIterator[str]:
+    """Stream a docker-compose.yml for multi-service and single-service projects."""
+    return stream_with_ai(_prompt_context(context), SYSTEM_COMPOSE)
+
 
-    Include instructions on how to build and run the containers, best practices, and troubleshooting tips.
+def stream_docker_readme(context: dict) -> AsyncIterator[str]:
+    """Stream documentation for the Docker setup."""
+    return stream_with_ai(_prompt_context(context), SYSTEM_README)
+
+
+def _parse_artifacts(content: str) -> GeneratedArtifacts:
+    """Parse the batched JSON reply, requiring a string for each artifact."""
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Malformed AI response, expected dockerfile/compose/readme JSON: {str(e)}")
+    keys = ('dockerfile', 'compose', 'readme')
+    if not isinstance(data, dict) or not all(isinstance(data.get(key), str) for key in keys):
+        raise ValueError("Malformed AI response, expected dockerfile/compose/readme JSON strings")
+    return GeneratedArtifacts(**{key: data[key] for key in keys})
+
+
+@handle_errors
+async def generate_all(context: dict) -> GeneratedArtifacts:
+    """Generate the Dockerfile, docker-compose.yml and README in a single request.
 
-    Provide ONLY the markdown content.
+    Artifacts generated for an identical or near-identical project context are
+    reused from the semantic cache without calling the model.
     """
-    return generate_with_ai(prompt, "You are a DevOps documentation expert.")
+    fingerprint = _context_fingerprint(context)
+    if _cache_settings['enabled'] and not _cache_settings['refresh']:
+        cached = _lookup_artifacts(fingerprint)
+        if cached is not None:
+            return cached
+    content, cacheable, cache_path = await _generate(
+        _prompt_context(context),
+        SYSTEM_ALL,
+        BATCH_MAX_TOKENS,
+        {"type": "json_object"}
+    )
+    artifacts = _parse_artifacts(content)
+    # Only cache the reply once it is known to be well-formed
+    if cache_path:
+        _write_cache(cache_path, content)
+    if _cache_settings['enabled'] and cacheable:
+        _store_artifacts(fingerprint, artifacts)
+    return artifacts
@@ -1,17 +1,22 @@
 # config.py
 import os
 
-# Get API key from environment
+# Get API key from environment; it is checked when the OpenAI client is first built
 API_KEY = os.getenv('OPENAI_API_KEY')
-if not API_KEY:
-    raise ValueError("No API key found. Please set the OPENAI_API_KEY environment variable.")
 
 SUPPORTED_PROJECT_TYPES = ['node', 'python', 'java', 'go', 'dotnet']
 DEFAULT_IGNORE_PATTERNS = [
     '**/node_modules', '**/.git', '**/__pycache__', '*.env', '*.secret',
     '**/*.log', '**/venv', '**/.idea', '**/.vscode'
 ]
-AI_MODEL = "gpt-4"
+AI_MODEL = "gpt-4o"
 MAX_TOKENS = 2000
+# The batched request returns all three artifacts in one response
+BATCH_MAX_TOKENS = 3 * MAX_TOKENS
+# Optional OpenAI-compatible local endpoint (e.g. Ollama at http://localhost:11434/v1),
+# used when OpenAI is unreachable or rate-limited after retries
+OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL')
+OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'llama3')
+CACHE_DIR = os.path.expanduser(os.getenv('DOCKER_GEN_CACHE_DIR', '~/.cache/docker-gen'))
 
 # In future, load additional user configuration (e.g., from config.yaml) if needed.
\ No newline at end of file
@@ -1,9 +1,31 @@
 # error_handling.py
+import inspect
 import logging
 from functools import wraps
 
 def handle_errors(func):
     """Decorator to catch exceptions and log detailed error messages."""
+    if inspect.isasyncgenfunction(func):
+        @wraps(func)
+        async def async_gen_wrapper(*args, **kwargs):
+            try:
+                async for item in func(*args, **kwargs):
+                    yield item
+            except Exception as e:
+                logging.error(f"Error in {func.__name__}: {str(e)}")
+                raise
+        return async_gen_wrapper
+
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                logging.error(f"Error in {func.__name__}: {str(e)}")
+                raise
+        return async_wrapper
+
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
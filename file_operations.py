@@ -1,14 +1,39 @@
 # file_operations.py
+import os
 import logging
 from pathlib import Path
+from typing import AsyncIterable, Iterable, Union
+import aiofiles
 from error_handling import handle_errors
 
 @handle_errors
-def write_config(output_dir: str, filename: str, content: str, force: bool = False) -> None:
-    """Safely write content to a file with conflict resolution."""
+def check_outputs_writable(output_dir: str, filenames: Iterable[str], force: bool = False) -> None:
+    """Fail before any generation starts if an output file exists and force is not set."""
+    for filename in filenames:
+        output_path = Path(output_dir) / filename
+        if output_path.exists() and not force:
+            raise FileExistsError(f"{output_path} exists. Use --force to overwrite.")
+
+@handle_errors
+async def write_config(output_dir: str, filename: str, content: Union[str, AsyncIterable[str]],
+                       force: bool = False) -> None:
+    """Safely write content, or a stream of content chunks, to a file with conflict resolution."""
     output_path = Path(output_dir) / filename
     if output_path.exists() and not force:
         raise FileExistsError(f"{output_path} exists. Use --force to overwrite.")
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    output_path.write_text(content)
+    # Write to a temporary file so an interrupted stream never leaves a partial config behind
+    tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+    try:
+        async with aiofiles.open(tmp_path, 'w') as f:
+            if isinstance(content, str):
+                await f.write(content)
+            else:
+                async for chunk in content:
+                    await f.write(chunk)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        # Also covers cancellation of a streaming write
+        tmp_path.unlink(missing_ok=True)
+        raise
     logging.info(f"Generated: {output_path}")
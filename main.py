@@ -1,12 +1,53 @@
 # main.py
 import os
 import sys
+import asyncio
 import logging
 import argparse
+from pathlib import Path
 from logging_setup import setup_logging
 from project_analysis import analyze_project_structure
-from ai_generation import generate_dockerfile, generate_docker_compose, generate_docker_readme
-from file_operations import write_config
+from ai_generation import (close_client, configure_cache, generate_all, stream_dockerfile, stream_docker_compose,
+                           stream_docker_readme)
+from file_operations import check_outputs_writable, write_config
+from validation import validate_dockerfile
+
+
+OUTPUT_FILES = ('Dockerfile', 'docker-compose.yml', 'dockerreadme.md')
+
+
+async def _write_all(output_dir: str, contents: dict, force: bool) -> None:
+    """Write each artifact concurrently; if one fails, the others are cancelled before the error propagates."""
+    try:
+        async with asyncio.TaskGroup() as group:
+            for filename, content in contents.items():
+                group.create_task(write_config(output_dir, filename, content, force))
+    except ExceptionGroup as eg:
+        raise eg.exceptions[0] from None
+
+
+async def _run(context: dict, args: argparse.Namespace) -> None:
+    """Generate all artifacts and write them to the output directory."""
+    # Refuse up front, so no request is made and no partial output is written
+    check_outputs_writable(args.output, OUTPUT_FILES, args.force)
+    try:
+        if args.stream:
+            # One streamed request per artifact, each written to disk as tokens arrive
+            await _write_all(args.output, {
+                'Dockerfile': stream_dockerfile(context),
+                'docker-compose.yml': stream_docker_compose(context),
+                'dockerreadme.md': stream_docker_readme(context)
+            }, args.force)
+            validate_dockerfile((Path(args.output) / 'Dockerfile').read_text())
+            return
+        artifacts = await generate_all(context)
+    finally:
+        await close_client()
+    await _write_all(args.output, {
+        'Dockerfile': validate_dockerfile(artifacts.dockerfile),
+        'docker-compose.yml': artifacts.compose,
+        'dockerreadme.md': artifacts.readme
+    }, args.force)
 
 
 def main():
@@ -18,6 +59,12 @@ def main():
     parser.add_argument('-o', '--output', default='.', help='Output directory')
     parser.add_argument('-f', '--force', action='store_true', help='Overwrite existing files')
     parser.add_argument('-v', '--verbose', action='store_true', help='Enable debug logging')
+    parser.add_argument('--deep-scan', action='store_true',
+                        help='Always scan source files for ports, even when config files already determine them')
+    parser.add_argument('--stream', action='store_true',
+                        help='Stream each file to disk as it is generated (one request per file)')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the AI response cache')
+    parser.add_argument('--refresh-cache', action='store_true', help='Ignore cached AI responses and regenerate them')
     args = parser.parse_args()
 
     setup_logging(args.verbose)
@@ -26,21 +73,11 @@ def main():
         logging.error("OPENAI_API_KEY environment variable required")
         sys.exit(1)
 
-    try:
-        context = analyze_project_structure(args.project_dir)
-
-        # Generate and write Dockerfile
-        dockerfile_content = generate_dockerfile(context)
-        write_config(args.output, 'Dockerfile', dockerfile_content, args.force)
-
-        # Generate and write docker-compose.yml
-        compose_content = generate_docker_compose(context)
-        write_config(args.output, 'docker-compose.yml', compose_content, args.force)
-
-        # Generate Docker documentation README
-        docker_readme = generate_docker_readme(context)
-        write_config(args.output, 'dockerreadme.md', docker_readme, args.force)
+    configure_cache(enabled=not args.no_cache, refresh=args.refresh_cache)
 
+    try:
+        context = analyze_project_structure(args.project_dir, deep_scan=args.deep_scan)
+        asyncio.run(_run(context, args))
         logging.info("Successfully generated infrastructure configuration and documentation.")
     except Exception as e:
         logging.critical(f"Fatal error: {str(e)}")
@@ -1,12 +1,47 @@
 # project_analysis.py
 import os
 import re
-import json
+import mmap
+import fnmatch
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterator, List, Set
+from config import DEFAULT_IGNORE_PATTERNS
 from error_handling import handle_errors
 
+# orjson parses bytes in C; fall back to the stdlib when it isn't installed
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
+# Source-code port patterns fused into one alternation so each file is scanned once
+PORT_RE = re.compile(rb'\.listen\(.*?(\d{4,5})|PORT\s*[:=]\s*(\d+)|port:\s*(\d+)|\bport\s*=\s*(\d+)')
+EXPOSE_RE = re.compile(rb'EXPOSE\s+(\d+)')
+PORT_SCAN_EXTENSIONS = ('.js', '.py', '.java', '.go', '.cs')
+# Larger sources are almost always minified or vendored bundles
+MAX_PORT_SCAN_BYTES = 4 * 1024 * 1024
+SCANNED_FILE_NAMES = ('package.json', '.env', 'Dockerfile')
+# All ignore globs in one precompiled regex, matched against '/'-separated paths
+IGNORE_RE = re.compile('|'.join(fnmatch.translate(p) for p in DEFAULT_IGNORE_PATTERNS))
+# File reads are I/O-bound, so oversubscribe the CPU count
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+FRAMEWORK_PORTS = {
+    'node': 3000, 'react': 3000, 'express': 3000,
+    'django': 8000, 'flask': 5000, 'spring-boot': 8080,
+    'dotnet': 5000
+}
+
+@dataclass
+class FileScanResult:
+    """Information extracted from a single project file."""
+    ports: List[int] = field(default_factory=list)
+    frameworks: List[str] = field(default_factory=list)
+    env_vars: Dict[str, str] = field(default_factory=dict)
+    entry_points: List[str] = field(default_factory=list)
+
 def parse_env_file(file_path: Path) -> Dict[str, str]:
     """Parse .env file into key-value pairs."""
     env_vars = {}
@@ -33,18 +68,72 @@ def register_docker_service(file_path: Path, context: Dict) -> None:
     }
     logging.info(f"Registered Docker service: {service_name}")
 
+def scan_package_json(file_path: Path, result: FileScanResult) -> None:
+    """Collect frameworks and entry points from a package.json file."""
+    try:
+        pkg = json_loads(file_path.read_bytes())
+        deps = pkg.get('dependencies', {})
+        if 'react' in deps:
+            result.frameworks.append('react')
+        if 'express' in deps:
+            result.frameworks.append('express')
+        if 'main' in pkg:
+            result.entry_points.append(pkg['main'])
+        if 'scripts' in pkg and 'start' in pkg['scripts']:
+            result.entry_points.append(pkg['scripts']['start'])
+    except Exception as e:
+        logging.warning(f"Error reading {file_path}: {str(e)}")
+
+def scan_dockerfile_ports(file_path: Path, result: FileScanResult) -> None:
+    """Collect ports from EXPOSE instructions in a Dockerfile."""
+    try:
+        # Only ASCII digits are extracted, so there is no need to decode the file
+        content = file_path.read_bytes()
+    except Exception as e:
+        logging.warning(f"Error reading Dockerfile: {str(e)}")
+        return
+    result.ports.extend(int(m) for m in EXPOSE_RE.findall(content))
+
+def scan_source_ports(file_path: Path, result: FileScanResult) -> None:
+    """Collect port numbers referenced in a source file."""
+    try:
+        with open(file_path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0 or size > MAX_PORT_SCAN_BYTES:
+                return
+            # Scan the mapped bytes directly instead of decoding the whole file
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for match in PORT_RE.finditer(mm):
+                    result.ports.extend(int(g) for g in match.groups() if g)
+    except Exception as e:
+        logging.debug(f"Error reading {file_path}: {str(e)}")
+
+def _scan_file(file_path: str) -> FileScanResult:
+    """Read and parse a single project file; runs on a worker thread."""
+    path = Path(file_path)
+    result = FileScanResult()
+    if path.name == 'package.json':
+        scan_package_json(path, result)
+    elif path.name == '.env':
+        result.env_vars = parse_env_file(path)
+    elif path.name == 'Dockerfile':
+        scan_dockerfile_ports(path, result)
+    else:
+        scan_source_ports(path, result)
+    return result
+
 def detect_microservices(context: Dict) -> None:
     """Detect microservices architecture patterns."""
     docker_services = [s for s in context['services'].values() if s['type'] == 'docker']
     if len(docker_services) > 1:
-        context['service_patterns'].append('microservices')
+        context['service_patterns'].add('microservices')
         logging.info("Detected microservices architecture")
     # Check for common service directories
     service_dirs = {'src/services', 'services', 'apps'}
     for file_path in context['detected_files']:
         parent_dir = Path(file_path).parent.name
         if parent_dir in service_dirs:
-            context['service_patterns'].append('service-directory')
+            context['service_patterns'].add('service-directory')
             logging.info(f"Found service directory: {parent_dir}")
 
 def detect_entry_points(context: Dict) -> None:
@@ -52,117 +141,134 @@ def detect_entry_points(context: Dict) -> None:
     entry_points = []
     project_type = context['project_type']
     if project_type == 'node':
-        for file in context['detected_files']:
-            if file.endswith('package.json'):
-                try:
-                    with open(file) as f:
-                        pkg = json.load(f)
-                        if 'main' in pkg:
-                            entry_points.append(pkg['main'])
-                        if 'scripts' in pkg and 'start' in pkg['scripts']:
-                            entry_points.append(pkg['scripts']['start'])
-                except Exception as e:
-                    logging.warning(f"Error reading {file}: {str(e)}")
+        # package.json entry points were collected while scanning files
+        entry_points = list(context['_package_entry_points'])
     elif project_type == 'python':
         common_entries = ['app.py', 'main.py', 'manage.py', 'wsgi.py']
         entry_points = [f for f in context['detected_files'] if Path(f).name in common_entries]
     elif project_type == 'java':
         entry_points = [f for f in context['detected_files'] if f.endswith(('Application.java', 'Main.java'))]
-    context['entry_points'] = list(set(entry_points))
+    # Sorted so prompts (and their cache keys) are identical across runs
+    context['entry_points'] = sorted(set(entry_points))
     logging.info(f"Detected entry points: {context['entry_points']}")
 
-def detect_ports(context: Dict) -> None:
-    """Detect potential ports from environment, Dockerfiles, and code patterns."""
-    ports = set()
+def is_ignored(path: str) -> bool:
+    """Return True if a path matches one of the DEFAULT_IGNORE_PATTERNS globs."""
+    return IGNORE_RE.match(path.replace(os.sep, '/')) is not None
+
+def iter_project_files(root: str) -> Iterator[os.DirEntry]:
+    """Yield non-ignored files under root, top-down like os.walk, pruning ignored directories.
+
+    DirEntry objects carry the file type from the directory listing, so files are
+    classified without stat calls; sizes are checked by the worker's fstat instead.
+    """
+    subdirs = []
+    try:
+        with os.scandir(root) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not is_ignored(entry.path):
+                        subdirs.append(entry.path)
+                elif entry.is_file():
+                    # Files the analyzer parses itself (e.g. .env, read for variable names only) are always kept
+                    if entry.name in SCANNED_FILE_NAMES or not is_ignored(entry.path):
+                        yield entry
+    except OSError as e:
+        logging.debug(f"Error listing {root}: {str(e)}")
+    for subdir in subdirs:
+        yield from iter_project_files(subdir)
+
+def _configured_ports(context: Dict) -> Set[int]:
+    """Return the valid ports set by the PORT env var and by Dockerfile/source scans so far."""
+    ports = set(context['ports'])
     if 'PORT' in context['env_vars']:
         try:
             ports.add(int(context['env_vars']['PORT']))
         except ValueError:
             pass
-    for service in context['services'].values():
-        if service['type'] == 'docker':
-            try:
-                with open(service['dockerfile']) as f:
-                    content = f.read()
-                    matches = re.findall(r'EXPOSE\s+(\d+)', content)
-                    ports.update(map(int, matches))
-            except Exception as e:
-                logging.warning(f"Error reading Dockerfile: {str(e)}")
-    port_patterns = [
-        r'\.listen\(.*?(\d{4,5})',
-        r'PORT\s*[:=]\s*(\d+)',
-        r'port:\s*(\d+)',
-        r'\bport\s*=\s*(\d+)'
-    ]
-    for file in context['detected_files']:
-        if any(file.endswith(ext) for ext in ['.js', '.py', '.java', '.go', '.cs']):
-            try:
-                with open(file) as f:
-                    content = f.read()
-                    for pattern in port_patterns:
-                        matches = re.findall(pattern, content)
-                        ports.update(map(int, matches))
-            except Exception as e:
-                logging.debug(f"Error reading {file}: {str(e)}")
+    return {p for p in ports if 1 <= p <= 65535}
+
+def needs_source_port_scan(context: Dict) -> bool:
+    """Return True unless env, Dockerfiles, or framework defaults already determine the ports."""
+    # Several services or frameworks with different defaults may each listen elsewhere
+    if len(context['services']) > 1:
+        return True
+    default_ports = {FRAMEWORK_PORTS[f] for f in context['frameworks'] if f in FRAMEWORK_PORTS}
+    if len(default_ports) > 1:
+        return True
+    return not (_configured_ports(context) or default_ports)
+
+def _merge_scan_results(context: Dict, executor: ThreadPoolExecutor, targets: List[str]) -> None:
+    """Parse files on the pool and merge results in walk order for deterministic output."""
+    for result in executor.map(_scan_file, targets):
+        context['ports'].extend(result.ports)
+        context['frameworks'].update(result.frameworks)
+        context['env_vars'].update(result.env_vars)
+        context['_package_entry_points'].extend(result.entry_points)
+
+def detect_ports(context: Dict) -> None:
+    """Detect potential ports from environment, Dockerfiles, code patterns, and framework defaults."""
+    # Env PORT plus ports from Dockerfiles and source code collected during the project walk
+    ports = _configured_ports(context)
     # Add framework default ports
-    framework_ports = {
-        'node': 3000, 'react': 3000, 'express': 3000,
-        'django': 8000, 'flask': 5000, 'spring-boot': 8080,
-        'dotnet': 5000
-    }
     for framework in context['frameworks']:
-        if framework in framework_ports:
-            ports.add(framework_ports[framework])
-    context['ports'] = sorted([p for p in ports if 1 <= p <= 65535])
+        if framework in FRAMEWORK_PORTS:
+            ports.add(FRAMEWORK_PORTS[framework])
+    context['ports'] = sorted(ports)
     logging.info(f"Detected ports: {context['ports']}")
 
 @handle_errors
-def analyze_project_structure(project_path: str) -> Dict:
-    """Analyze the project structure and return a context dictionary."""
+def analyze_project_structure(project_path: str, deep_scan: bool = False) -> Dict:
+    """Analyze the project structure and return a context dictionary.
+
+    Source files are only scanned for ports when config files leave them
+    undetermined, unless deep_scan is set.
+    """
     context = {
         'project_type': 'unknown',
-        'frameworks': [],
+        # Sets while scanning so repeated detections are listed (and sent to the model) once
+        'frameworks': set(),
         'services': {},
         'dependencies': {},
         'env_vars': {},
         'entry_points': [],
         'ports': [],
         'detected_files': [],
-        'service_patterns': []
+        'service_patterns': set(),
+        '_package_entry_points': []
     }
-    for root, dirs, files in os.walk(project_path):
-        dirs[:] = [d for d in dirs if d not in ['node_modules', 'venv', '.git']]
-        for file in files:
-            file_path = Path(root) / file
-            context['detected_files'].append(str(file_path))
-            # Detect project type based on key files
-            if file == 'package.json':
-                context['project_type'] = 'node'
-            elif file == 'requirements.txt':
-                context['project_type'] = 'python'
-            elif file == 'pom.xml':
-                context['project_type'] = 'java'
-            elif file == 'go.mod':
-                context['project_type'] = 'go'
-            elif file.endswith('.csproj'):
-                context['project_type'] = 'dotnet'
-            # Detect frameworks from package.json dependencies
-            if file == 'package.json':
-                try:
-                    with open(file_path) as f:
-                        pkg = json.load(f)
-                        deps = pkg.get('dependencies', {})
-                        if 'react' in deps:
-                            context['frameworks'].append('react')
-                        if 'express' in deps:
-                            context['frameworks'].append('express')
-                except Exception as e:
-                    logging.warning(f"Error reading {file_path}: {str(e)}")
-            if file == '.env':
-                context['env_vars'].update(parse_env_file(file_path))
-            if file == 'Dockerfile':
-                register_docker_service(file_path, context)
+    config_targets = []
+    source_targets = []
+    for entry in iter_project_files(project_path):
+        file = entry.name
+        context['detected_files'].append(entry.path)
+        # Detect project type based on key files
+        if file == 'package.json':
+            context['project_type'] = 'node'
+        elif file == 'requirements.txt':
+            context['project_type'] = 'python'
+        elif file == 'pom.xml':
+            context['project_type'] = 'java'
+        elif file == 'go.mod':
+            context['project_type'] = 'go'
+        elif file.endswith('.csproj'):
+            context['project_type'] = 'dotnet'
+        if file == 'Dockerfile':
+            register_docker_service(Path(entry.path), context)
+        if file in SCANNED_FILE_NAMES:
+            config_targets.append(entry.path)
+        elif file.endswith(PORT_SCAN_EXTENSIONS):
+            source_targets.append(entry.path)
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        _merge_scan_results(context, executor, config_targets)
+        if deep_scan or needs_source_port_scan(context):
+            _merge_scan_results(context, executor, source_targets)
+        else:
+            logging.debug(f"Ports determined by config files; skipped scanning {len(source_targets)} source files")
     detect_microservices(context)
     detect_entry_points(context)
+    del context['_package_entry_points']
     detect_ports(context)
+    context['frameworks'] = sorted(context['frameworks'])
+    context['service_patterns'] = sorted(context['service_patterns'])
     return context
@@ -0,0 +1,268 @@
+import json
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import ai_generation
+
+
+def test_cache_path_is_stable_for_identical_requests(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_generation, 'CACHE_DIR', str(tmp_path))
+    first = ai_generation._cache_path('{"ports": [3000]}', 'system', 2000, None)
+    second = ai_generation._cache_path('{"ports": [3000]}', 'system', 2000, None)
+    assert first == second
+    assert first.parent == tmp_path
+
+
+def test_cache_path_changes_with_any_request_input(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_generation, 'CACHE_DIR', str(tmp_path))
+    base = ai_generation._cache_path('prompt', 'system', 2000, None)
+    assert ai_generation._cache_path('prompt2', 'system', 2000, None) != base
+    assert ai_generation._cache_path('prompt', 'system2', 2000, None) != base
+    assert ai_generation._cache_path('prompt', 'system', 6000, None) != base
+    assert ai_generation._cache_path('prompt', 'system', 2000, {'type': 'json_object'}) != base
+    monkeypatch.setattr(ai_generation, 'AI_MODEL', 'other-model')
+    assert ai_generation._cache_path('prompt', 'system', 2000, None) != base
+
+
+def test_cache_round_trip_leaves_no_temp_files(tmp_path):
+    path = tmp_path / 'nested' / 'entry.txt'
+    assert ai_generation._read_cache(path) is None
+    ai_generation._write_cache(path, 'FROM node:20\n')
+    assert ai_generation._read_cache(path) == 'FROM node:20\n'
+    assert [p.name for p in path.parent.iterdir()] == ['entry.txt']
+
+
+def _context(**overrides):
+    context = {
+        'project_type': 'node',
+        'frameworks': ['express'],
+        'services': {'web': {}},
+        'entry_points': ['node server.js'],
+        'ports': [3000],
+        'env_vars': {'PORT': '3000'}
+    }
+    context.update(overrides)
+    return context
+
+
+ARTIFACTS = ai_generation.GeneratedArtifacts(
+    dockerfile='FROM node:20\nENV PORT=3000\nEXPOSE 3000\nRUN sleep 3000\nCMD ["node", "server.js"]\n',
+    compose='services:\n  web:\n    ports:\n      - "3000:3000"\n    deploy: {resources: {limits: {memory: 3000M}}}\n',
+    readme='Open http://localhost:3000 after about 3000 ms.\n'
+)
+
+
+def test_replace_ports_only_rewrites_port_references():
+    port_map = {3000: 4000}
+    assert ai_generation._replace_ports(ARTIFACTS.dockerfile, port_map) == (
+        'FROM node:20\nENV PORT=4000\nEXPOSE 4000\nRUN sleep 3000\nCMD ["node", "server.js"]\n')
+    assert ai_generation._replace_ports(ARTIFACTS.compose, port_map) == (
+        'services:\n  web:\n    ports:\n      - "4000:4000"\n    deploy: {resources: {limits: {memory: 3000M}}}\n')
+    assert ai_generation._replace_ports(ARTIFACTS.readme, port_map) == (
+        'Open http://localhost:4000 after about 3000 ms.\n')
+
+
+def test_replace_ports_handles_swapped_and_multiple_ports():
+    text = 'EXPOSE 3000 8080/tcp\nports:\n  - 127.0.0.1:8080:8080\n  - "3000:3000"\n'
+    assert ai_generation._replace_ports(text, {3000: 8080, 8080: 3000}) == (
+        'EXPOSE 8080 3000/tcp\nports:\n  - 127.0.0.1:3000:3000\n  - "8080:8080"\n')
+
+
+def test_lookup_artifacts_exact_and_near_match(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_generation, 'CACHE_DIR', str(tmp_path))
+    ai_generation._store_artifacts(ai_generation._context_fingerprint(_context()), ARTIFACTS)
+
+    assert ai_generation._lookup_artifacts(ai_generation._context_fingerprint(_context())) == ARTIFACTS
+
+    # "sleep 3000" might be a port reference nobody recognised, so it isn't adapted
+    assert ai_generation._lookup_artifacts(ai_generation._context_fingerprint(_context(ports=[5000]))) is None
+
+
+def test_lookup_artifacts_adapts_near_match_with_only_port_references(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_generation, 'CACHE_DIR', str(tmp_path))
+    artifacts = ai_generation.GeneratedArtifacts(
+        dockerfile='FROM node:20\nENV PORT=3000\nEXPOSE 3000 9229\nCMD ["node", "server.js"]\n',
+        compose='services:\n  web:\n    ports:\n      - "3000:3000"\n      - "9229:9229"\n',
+        readme='Open http://localhost:3000 and attach a debugger to :9229.\n'
+    )
+    ai_generation._store_artifacts(ai_generation._context_fingerprint(_context(ports=[3000, 9229])), artifacts)
+
+    adapted = ai_generation._lookup_artifacts(ai_generation._context_fingerprint(_context(ports=[9229, 10000])))
+    assert 'EXPOSE 10000 9229' in adapted.dockerfile
+    assert '"10000:10000"' in adapted.compose
+    assert '"9229:9229"' in adapted.compose
+    assert 'localhost:10000' in adapted.readme
+
+
+@pytest.mark.parametrize('dockerfile, compose', [
+    ('FROM python:3.12\nENV PORT 8000\nEXPOSE 8000\n', 'services: {}\n'),
+    ('FROM python:3.12\nEXPOSE 8000\nCMD ["uvicorn", "app:app", "--port", "8000"]\n', 'services: {}\n'),
+    ('FROM python:3.12\nEXPOSE 8000\n', 'services:\n  web:\n    ports:\n      - "${PORT:-8000}:8000"\n'),
+])
+def test_lookup_artifacts_misses_when_a_port_reference_is_not_recognised(tmp_path, monkeypatch,
+                                                                          dockerfile, compose):
+    monkeypatch.setattr(ai_generation, 'CACHE_DIR', str(tmp_path))
+    artifacts = ai_generation.GeneratedArtifacts(dockerfile=dockerfile, compose=compose, readme='Run it.\n')
+    ai_generation._store_artifacts(ai_generation._context_fingerprint(_context(ports=[8000])), artifacts)
+
+    assert ai_generation._lookup_artifacts(ai_generation._context_fingerprint(_context(ports=[9000]))) is None
+
+
+def test_lookup_artifacts_misses_when_other_fields_differ(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_generation, 'CACHE_DIR', str(tmp_path))
+    ai_generation._store_artifacts(ai_generation._context_fingerprint(_context()), ARTIFACTS)
+
+    for changed in (_context(entry_points=['index.js']), _context(services={'api': {}}),
+                    _context(env_vars={'DB_URL': 'x'}), _context(frameworks=['react']),
+                    _context(ports=[3000, 4000])):
+        assert ai_generation._lookup_artifacts(ai_generation._context_fingerprint(changed)) is None
+
+
+def test_lookup_artifacts_misses_after_model_or_prompt_change(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_generation, 'CACHE_DIR', str(tmp_path))
+    fingerprint = ai_generation._context_fingerprint(_context())
+    ai_generation._store_artifacts(fingerprint, ARTIFACTS)
+
+    monkeypatch.setattr(ai_generation, 'AI_MODEL', 'other-model')
+    assert ai_generation._lookup_artifacts(fingerprint) is None
+    monkeypatch.undo()
+    monkeypatch.setattr(ai_generation, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(ai_generation, 'SYSTEM_ALL', ai_generation.SYSTEM_ALL + '\nBe brief.')
+    assert ai_generation._lookup_artifacts(fingerprint) is None
+
+
+def test_artifact_cache_errors_fall_through(tmp_path, monkeypatch):
+    blocker = tmp_path / 'not-a-dir'
+    blocker.write_text('')
+    monkeypatch.setattr(ai_generation, 'CACHE_DIR', str(blocker / 'cache'))
+    fingerprint = ai_generation._context_fingerprint(_context())
+
+    ai_generation._store_artifacts(fingerprint, ARTIFACTS)
+    assert ai_generation._lookup_artifacts(fingerprint) is None
+
+
+def _reply(content, finish_reason='stop'):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content),
+                                                    finish_reason=finish_reason)])
+
+
+def _stub_completion(monkeypatch, content, from_fallback=False):
+    async def fake_complete(*args, **kwargs):
+        return _reply(content), from_fallback
+    monkeypatch.setattr(ai_generation, '_complete', fake_complete)
+
+
+def _cached_entries(tmp_path):
+    return sorted(p.name for p in tmp_path.iterdir() if p.suffix == '.txt')
+
+
+@pytest.mark.parametrize('data', [
+    {'dockerfile': 'FROM node:20\n', 'compose': 'services: {}\n'},
+    {'dockerfile': 'FROM node:20\n', 'compose': {'services': {}}, 'readme': 'Run it.\n'},
+    ['FROM node:20\n'],
+])
+def test_generate_all_rejects_malformed_reply_without_caching(tmp_path, monkeypatch, data):
+    monkeypatch.setattr(ai_generation, 'CACHE_DIR', str(tmp_path))
+    _stub_completion(monkeypatch, json.dumps(data))
+
+    with pytest.raises(ValueError):
+        asyncio.run(ai_generation.generate_all(_context()))
+    assert _cached_entries(tmp_path) == []
+    assert ai_generation._lookup_artifacts(ai_generation._context_fingerprint(_context())) is None
+
+
+def test_generate_all_caches_valid_reply(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_generation, 'CACHE_DIR', str(tmp_path))
+    _stub_completion(monkeypatch, json.dumps(vars(ARTIFACTS)))
+
+    assert asyncio.run(ai_generation.generate_all(_context())) == ARTIFACTS
+    assert len(_cached_entries(tmp_path)) == 1
+    assert ai_generation._lookup_artifacts(ai_generation._context_fingerprint(_context())) == ARTIFACTS
+
+
+def _connection_error():
+    import httpx
+    import openai
+    return openai.APIConnectionError(request=httpx.Request('POST', 'https://api.openai.com/v1/chat/completions'))
+
+
+def test_is_transient_error_only_accepts_rate_limits_and_connection_problems():
+    import httpx
+    import openai
+    request = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+    assert ai_generation._is_transient_error(_connection_error())
+    assert ai_generation._is_transient_error(openai.APITimeoutError(request=request))
+    assert ai_generation._is_transient_error(
+        openai.RateLimitError('slow down', response=httpx.Response(429, request=request), body=None))
+    assert not ai_generation._is_transient_error(
+        openai.AuthenticationError('bad key', response=httpx.Response(401, request=request), body=None))
+    assert not ai_generation._is_transient_error(ValueError('bad prompt'))
+
+
+def _stub_openai(monkeypatch, error, fallback_content='FROM ollama\n'):
+    """Make every OpenAI request fail with error and route fallback requests to a fake reply."""
+    calls = []
+
+    async def failing_create(*args, **kwargs):
+        raise error
+
+    async def fake_request(client, model, prompt, system_role, max_tokens, response_format, stream):
+        calls.append(model)
+        if not stream:
+            return _reply(fallback_content)
+
+        async def chunks():
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=fallback_content),
+                                                           finish_reason='stop')])
+        return chunks()
+
+    monkeypatch.setattr(ai_generation, '_create_completion', failing_create)
+    monkeypatch.setattr(ai_generation, '_request_completion', fake_request)
+    monkeypatch.setattr(ai_generation, '_get_fallback_client', lambda: object())
+    return calls
+
+
+def test_complete_reraises_without_fallback_configured(monkeypatch):
+    monkeypatch.setattr(ai_generation, 'OLLAMA_BASE_URL', None)
+    error = _connection_error()
+    calls = _stub_openai(monkeypatch, error)
+
+    with pytest.raises(type(error)):
+        asyncio.run(ai_generation._complete('prompt', 'system', 2000, None))
+    assert calls == []
+
+
+def test_complete_reraises_non_transient_errors(monkeypatch):
+    monkeypatch.setattr(ai_generation, 'OLLAMA_BASE_URL', 'http://localhost:11434/v1')
+    calls = _stub_openai(monkeypatch, ValueError('bad prompt'))
+
+    with pytest.raises(ValueError):
+        asyncio.run(ai_generation._complete('prompt', 'system', 2000, None))
+    assert calls == []
+
+
+def test_complete_falls_back_on_transient_errors(monkeypatch):
+    monkeypatch.setattr(ai_generation, 'OLLAMA_BASE_URL', 'http://localhost:11434/v1')
+    calls = _stub_openai(monkeypatch, _connection_error())
+
+    response, from_fallback = asyncio.run(ai_generation._complete('prompt', 'system', 2000, None))
+    assert from_fallback
+    assert response.choices[0].message.content == 'FROM ollama\n'
+    assert calls == [ai_generation.OLLAMA_MODEL]
+
+
+def test_fallback_output_is_never_cached(tmp_path, monkeypatch):
+    monkeypatch.setattr(ai_generation, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(ai_generation, 'OLLAMA_BASE_URL', 'http://localhost:11434/v1')
+    _stub_openai(monkeypatch, _connection_error(), fallback_content=json.dumps(vars(ARTIFACTS)))
+
+    async def stream():
+        return [part async for part in ai_generation.stream_with_ai('prompt', 'system')]
+
+    assert asyncio.run(ai_generation.generate_all(_context())) == ARTIFACTS
+    assert asyncio.run(ai_generation.generate_with_ai('prompt', 'system')) == json.dumps(vars(ARTIFACTS))
+    assert asyncio.run(stream()) == [json.dumps(vars(ARTIFACTS))]
+    assert _cached_entries(tmp_path) == []
+    assert ai_generation._lookup_artifacts(ai_generation._context_fingerprint(_context())) is None
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from file_operations import check_outputs_writable, write_config
+
+
+def test_check_outputs_writable_rejects_any_existing_file(tmp_path):
+    (tmp_path / 'docker-compose.yml').write_text('services: {}\n')
+    with pytest.raises(FileExistsError):
+        check_outputs_writable(str(tmp_path), ['Dockerfile', 'docker-compose.yml'])
+    check_outputs_writable(str(tmp_path), ['Dockerfile', 'docker-compose.yml'], force=True)
+
+
+def test_write_config_streams_chunks(tmp_path):
+    async def chunks():
+        yield 'FROM node:20\n'
+        yield 'EXPOSE 3000\n'
+
+    asyncio.run(write_config(str(tmp_path), 'Dockerfile', chunks()))
+    assert (tmp_path / 'Dockerfile').read_text() == 'FROM node:20\nEXPOSE 3000\n'
+    assert [p.name for p in tmp_path.iterdir()] == ['Dockerfile']
+
+
+def test_write_config_removes_temp_file_when_stream_fails(tmp_path):
+    async def chunks():
+        yield 'FROM node:20\n'
+        raise ConnectionError('stream dropped')
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(write_config(str(tmp_path), 'Dockerfile', chunks()))
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,36 @@
+import asyncio
+import argparse
+
+import pytest
+
+import main
+
+
+def test_stream_failure_cancels_sibling_writes_before_closing_client(tmp_path, monkeypatch):
+    events = []
+
+    async def failing(context):
+        yield 'FROM node:20\n'
+        raise RuntimeError('stream dropped')
+
+    async def slow(context):
+        try:
+            yield 'services: {}\n'
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            events.append('cancelled')
+            raise
+
+    async def fake_close_client():
+        events.append('closed')
+
+    monkeypatch.setattr(main, 'stream_dockerfile', failing)
+    monkeypatch.setattr(main, 'stream_docker_compose', slow)
+    monkeypatch.setattr(main, 'stream_docker_readme', slow)
+    monkeypatch.setattr(main, 'close_client', fake_close_client)
+    args = argparse.Namespace(output=str(tmp_path), force=False, stream=True)
+
+    with pytest.raises(RuntimeError, match='stream dropped'):
+        asyncio.run(main._run({}, args))
+    assert events == ['cancelled', 'cancelled', 'closed']
+    assert list(tmp_path.iterdir()) == []
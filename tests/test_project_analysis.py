@@ -0,0 +1,82 @@
+import pytest
+
+from project_analysis import (FileScanResult, analyze_project_structure, is_ignored, needs_source_port_scan,
+                              scan_package_json)
+
+
+def test_scan_package_json_collects_frameworks_and_entry_points(tmp_path):
+    path = tmp_path / 'package.json'
+    path.write_text('{"main": "server.js", "scripts": {"start": "node server.js"}, '
+                    '"dependencies": {"express": "4", "react": "18"}}')
+    result = FileScanResult()
+    scan_package_json(path, result)
+    assert result.frameworks == ['react', 'express']
+    assert result.entry_points == ['server.js', 'node server.js']
+
+
+@pytest.mark.parametrize('content', ['[1, 2]', '{"scripts": "npm start"}', '{"dependencies": 3}', '{not json'])
+def test_scan_package_json_tolerates_unexpected_shapes(tmp_path, content):
+    path = tmp_path / 'package.json'
+    path.write_text(content)
+    scan_package_json(path, FileScanResult())
+
+
+def _context(**overrides):
+    context = {'services': {}, 'frameworks': set(), 'ports': [], 'env_vars': {}}
+    context.update(overrides)
+    return context
+
+
+def test_needs_source_port_scan_skips_when_ports_are_known():
+    assert not needs_source_port_scan(_context(env_vars={'PORT': '8080'}))
+    assert not needs_source_port_scan(_context(ports=[9000]))
+    assert not needs_source_port_scan(_context(frameworks={'express', 'react'}))
+
+
+def test_needs_source_port_scan_ignores_invalid_ports():
+    assert needs_source_port_scan(_context(env_vars={'PORT': 'abc'}, ports=[99999]))
+    assert needs_source_port_scan(_context(ports=[0]))
+
+
+def test_needs_source_port_scan_when_ambiguous():
+    assert needs_source_port_scan(_context(ports=[9000], services={'web': {}, 'api': {}}))
+    assert needs_source_port_scan(_context(frameworks={'express', 'flask'}))
+
+
+def test_analyze_scans_sources_when_config_ports_are_invalid(tmp_path):
+    (tmp_path / '.env').write_text('PORT=abc\n')
+    (tmp_path / 'Dockerfile').write_text('FROM node:20\nEXPOSE 99999\n')
+    (tmp_path / 'src').mkdir()
+    (tmp_path / 'src' / 'server.js').write_text('app.listen(8081)\n')
+    assert analyze_project_structure(str(tmp_path))['ports'] == [8081]
+
+
+@pytest.mark.parametrize('path', ['./node_modules', 'proj/.git', 'a/b/__pycache__', 'proj/venv', './.idea',
+                                  'proj/.vscode', 'proj/debug.log', 'proj/app.secret', 'proj/prod.env'])
+def test_is_ignored_matches_default_patterns(path):
+    assert is_ignored(path)
+
+
+@pytest.mark.parametrize('path', ['proj/node_modules_old', 'proj/src', 'proj/app.py', 'proj/logs/app.py'])
+def test_is_ignored_keeps_other_paths(path):
+    assert not is_ignored(path)
+
+
+def test_analyze_prunes_ignored_paths_but_keeps_dotenv(tmp_path):
+    (tmp_path / '.env').write_text('PORT=4000\nSECRET=x\n')
+    (tmp_path / 'debug.log').write_text('port = 1111\n')
+    (tmp_path / 'node_modules' / 'dep').mkdir(parents=True)
+    (tmp_path / 'node_modules' / 'dep' / 'index.js').write_text('app.listen(2222)\n')
+    (tmp_path / 'app.py').write_text('print("hi")\n')
+    context = analyze_project_structure(str(tmp_path), deep_scan=True)
+    assert context['env_vars'] == {'PORT': '4000', 'SECRET': 'x'}
+    assert context['ports'] == [4000]
+    assert sorted(p.rsplit('/', 1)[-1] for p in context['detected_files']) == ['.env', 'app.py']
+
+
+def test_analyze_skips_empty_and_oversized_sources(tmp_path, monkeypatch):
+    monkeypatch.setattr('project_analysis.MAX_PORT_SCAN_BYTES', 64)
+    (tmp_path / 'empty.js').write_text('')
+    (tmp_path / 'bundle.js').write_text('app.listen(2222)\n' + '/' * 100)
+    (tmp_path / 'server.js').write_text('app.listen(8081)\n')
+    assert analyze_project_structure(str(tmp_path))['ports'] == [8081]
@@ -0,0 +1,21 @@
+import pytest
+
+from validation import dockerfile_warnings
+
+
+@pytest.mark.parametrize('content, expected', [
+    ('FROM node:20\nUSER node\nCOPY . /app\n', []),
+    ('FROM node:latest\n', ['Avoid latest tags']),
+    ('FROM --platform=linux/amd64 node:latest AS build\n', ['Avoid latest tags']),
+    ('USER root\n', ['Running as root user']),
+    ('ADD app.tar.gz /app\n', ['Use COPY instead of ADD']),
+    ('RUN curl | sh\n', ['Insecure pipe installation']),
+    # "add" inside apk commands is not an ADD instruction
+    ('RUN apk add curl\n', ['Missing cache cleanup']),
+    ('RUN apk add --no-cache curl\n', []),
+    ('FROM alpine:latest\nUSER root\nADD . /app\nRUN apk add curl && curl | sh\n',
+     ['Avoid latest tags', 'Running as root user', 'Use COPY instead of ADD',
+      'Insecure pipe installation', 'Missing cache cleanup']),
+])
+def test_dockerfile_warnings(content, expected):
+    assert dockerfile_warnings(content) == expected
@@ -0,0 +1,40 @@
+# validation.py
+import re
+import logging
+from typing import List
+from error_handling import handle_errors
+
+# All security checks in one alternation so the Dockerfile is scanned once. FROM, USER
+# and ADD are anchored to the start of an instruction line; apk/curl only ever occur
+# inside RUN lines, so no match can hide another check's match.
+CHECK_RE = re.compile(
+    r'(?P<latest>^[ \t]*FROM[ \t]+(?:--\S+[ \t]+)*\S+:latest\b)'
+    r'|(?P<root>^[ \t]*USER[ \t]+root\b)'
+    r'|(?P<add>^[ \t]*ADD\s)'
+    r'|(?P<curl>curl\s+\|)'
+    r'|(?P<apk>apk add\s+(?!.*--no-cache))',
+    re.IGNORECASE | re.MULTILINE
+)
+# Warning messages, in reporting order
+CHECK_MESSAGES = {
+    'latest': 'Avoid latest tags',
+    'root': 'Running as root user',
+    'add': 'Use COPY instead of ADD',
+    'curl': 'Insecure pipe installation',
+    'apk': 'Missing cache cleanup'
+}
+
+def dockerfile_warnings(content: str) -> List[str]:
+    """Return the security warnings that apply to a Dockerfile."""
+    found = {m.lastgroup for m in CHECK_RE.finditer(content)}
+    return [message for check, message in CHECK_MESSAGES.items() if check in found]
+
+@handle_errors
+def validate_dockerfile(content: str) -> str:
+    """Log security warnings for a generated Dockerfile and return it unchanged."""
+    warnings = dockerfile_warnings(content)
+    if warnings:
+        logging.warning("Security Warnings:")
+        for warn in warnings:
+            logging.warning(f"  - {warn}")
+    return content